@@ -0,0 +1,101 @@
+import os
+
+
+def read_meminfo(proc_root="/proc"):
+    """读取 /proc/meminfo，返回 {字段: kB}"""
+    info = {}
+    with open(os.path.join(proc_root, "meminfo"), "r") as f:
+        for line in f:
+            name, _, value = line.partition(":")
+            fields = value.split()
+            if fields:
+                info[name.strip()] = int(fields[0])
+    return info
+
+
+def read_loadavg(proc_root="/proc"):
+    """读取 /proc/loadavg 的 1 分钟平均负载"""
+    with open(os.path.join(proc_root, "loadavg"), "r") as f:
+        return float(f.read().split()[0])
+
+
+def read_pressure(resource, proc_root="/proc"):
+    """读取 /proc/pressure/{resource} 中 'some' 行的 avg10；内核不支持 PSI 时返回 None"""
+    try:
+        with open(os.path.join(proc_root, "pressure", resource), "r") as f:
+            for line in f:
+                if line.startswith("some"):
+                    fields = dict(field.split("=") for field in line.split()[1:])
+                    return float(fields["avg10"])
+    except (OSError, KeyError, ValueError):
+        return None
+    return None
+
+
+class AdmissionController:
+    """
+    根据节点内存、负载和 PSI 压力决定是否允许启动新任务
+
+    任一指标越过阈值即暂停启动新任务（已在运行的任务不受影响），指标恢复后自动放行。
+    阈值为 None 表示不检查该项。
+    """
+    def __init__(self, min_mem_available_mb=None, min_mem_available_ratio=None,
+                 max_load_per_cpu=None, max_memory_pressure=None, max_cpu_pressure=None,
+                 proc_root="/proc"):
+        """
+        :param min_mem_available_mb: MemAvailable 低于该值（MB）时暂停
+        :param min_mem_available_ratio: MemAvailable / MemTotal 低于该比例时暂停
+        :param max_load_per_cpu: 1 分钟负载 / CPU 数 高于该值时暂停
+        :param max_memory_pressure: /proc/pressure/memory some avg10（%）高于该值时暂停
+        :param max_cpu_pressure: /proc/pressure/cpu some avg10（%）高于该值时暂停
+        """
+        self.min_mem_available_mb = min_mem_available_mb
+        self.min_mem_available_ratio = min_mem_available_ratio
+        self.max_load_per_cpu = max_load_per_cpu
+        self.max_memory_pressure = max_memory_pressure
+        self.max_cpu_pressure = max_cpu_pressure
+        self.proc_root = proc_root
+        self.cpu_count = len(os.sched_getaffinity(0))
+        self.throttled = False
+        self.throttle_count = 0
+
+    def check(self):
+        """返回暂停原因字符串；允许启动时返回 None"""
+        if self.min_mem_available_mb is not None or self.min_mem_available_ratio is not None:
+            meminfo = read_meminfo(self.proc_root)
+            available = meminfo.get("MemAvailable", meminfo.get("MemFree", 0))
+            if self.min_mem_available_mb is not None and available / 1024 < self.min_mem_available_mb:
+                return f"MemAvailable {available / 1024:.0f}MB < {self.min_mem_available_mb}MB"
+            total = meminfo.get("MemTotal")
+            if self.min_mem_available_ratio is not None and total \
+                    and available / total < self.min_mem_available_ratio:
+                return f"MemAvailable {available / total:.1%} < {self.min_mem_available_ratio:.1%}"
+        if self.max_load_per_cpu is not None:
+            load = read_loadavg(self.proc_root) / self.cpu_count
+            if load > self.max_load_per_cpu:
+                return f"load/cpu {load:.2f} > {self.max_load_per_cpu}"
+        for resource, limit in (("memory", self.max_memory_pressure), ("cpu", self.max_cpu_pressure)):
+            if limit is None:
+                continue
+            pressure = read_pressure(resource, self.proc_root)
+            if pressure is not None and pressure > limit:
+                return f"{resource} pressure {pressure:.2f} > {limit}"
+        return None
+
+    def admit(self):
+        """
+        检查是否允许启动新任务，返回 (allowed, message)
+
+        message 只在状态切换时非空（开始限流/恢复），便于调用方记录决策而不刷屏。
+        """
+        reason = self.check()
+        if reason is not None:
+            if self.throttled:
+                return False, None
+            self.throttled = True
+            self.throttle_count += 1
+            return False, f"[throttle] 暂停启动新任务: {reason}"
+        if self.throttled:
+            self.throttled = False
+            return True, "[throttle] 压力解除，恢复启动任务"
+        return True, None
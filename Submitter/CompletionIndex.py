@@ -0,0 +1,81 @@
+import os
+import json
+import time
+import shutil
+import hashlib
+
+
+def normalize_command(command):
+    """合并多余空白，使仅空格不同的命令得到相同的键"""
+    return " ".join(command.split())
+
+
+class CompletionIndex:
+    """
+    磁盘上的任务完成索引：每个成功结束的任务对应 {index_dir}/xx/<sha256>.json
+
+    键只由规范化后的命令（函数任务为 function + kwargs）决定，因此总能按命令 invalidate；
+    声明的输入文件的大小和修改时间作为指纹保存在记录中，lookup 时与当前指纹不一致则视为未完成，
+    记录中声明的输出文件缺失时也视为未完成。
+    记录以临时文件 + os.replace 原子写入，多个 worker 共享同一 file_prefix 时无需加锁。
+    """
+    def __init__(self, index_dir):
+        self.index_dir = index_dir
+        os.makedirs(index_dir, exist_ok=True)
+
+    def key(self, command, spec=None):
+        spec = spec or {}
+        if spec.get("function"):
+            text = spec["function"] + " " + json.dumps(spec.get("kwargs", {}), sort_keys=True)
+        else:
+            text = normalize_command(command)
+        return hashlib.sha256(text.encode()).hexdigest()
+
+    def fingerprint(self, spec=None):
+        """声明的输入文件的指纹 {path: "size:mtime_ns"}，文件不存在时为 "missing" """
+        inputs = {}
+        for path in sorted((spec or {}).get("inputs", [])):
+            try:
+                st = os.stat(path)
+                inputs[path] = f"{st.st_size}:{st.st_mtime_ns}"
+            except OSError:
+                inputs[path] = "missing"
+        return inputs
+
+    def _path(self, key):
+        return os.path.join(self.index_dir, key[:2], f"{key}.json")
+
+    def lookup(self, key, inputs=None):
+        """
+        返回成功记录；不存在、输入文件指纹与 inputs 不一致或声明的输出文件缺失时返回 None
+        :param inputs: fingerprint() 的返回值
+        """
+        try:
+            with open(self._path(key), "r") as f:
+                record = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if record.get("inputs", {}) != (inputs or {}):
+            return None
+        if not all(os.path.exists(path) for path in record.get("outputs", [])):
+            return None
+        return record
+
+    def record(self, key, command, outputs=None, inputs=None):
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, "w") as f:
+            json.dump({"command": command, "inputs": inputs or {}, "outputs": list(outputs or []),
+                       "time": time.time()}, f)
+        os.replace(tmp, path)
+
+    def invalidate(self, key):
+        try:
+            os.remove(self._path(key))
+        except FileNotFoundError:
+            pass
+
+    def clear(self):
+        shutil.rmtree(self.index_dir, ignore_errors=True)
+        os.makedirs(self.index_dir, exist_ok=True)
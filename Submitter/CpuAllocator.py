@@ -0,0 +1,72 @@
+import os
+import glob
+
+
+def parse_cpulist(text):
+    """解析 '0-3,8,10-11' 格式的 CPU 列表"""
+    cpus = set()
+    for part in text.strip().split(","):
+        if not part:
+            continue
+        if "-" in part:
+            start, end = part.split("-")
+            cpus.update(range(int(start), int(end) + 1))
+        else:
+            cpus.add(int(part))
+    return cpus
+
+
+def read_numa_nodes(cpus, node_root="/sys/devices/system/node"):
+    """按 NUMA 节点对 cpus 分组；读不到拓扑时视为单节点"""
+    nodes = []
+    for path in sorted(glob.glob(os.path.join(node_root, "node[0-9]*", "cpulist"))):
+        with open(path, "r") as f:
+            node_cpus = parse_cpulist(f.read()) & set(cpus)
+        if node_cpus:
+            nodes.append(sorted(node_cpus))
+    covered = {cpu for node in nodes for cpu in node}
+    rest = sorted(set(cpus) - covered)
+    if rest:
+        nodes.append(rest)
+    return nodes
+
+
+class CpuAllocator:
+    """
+    在当前进程可用的 CPU（sched_getaffinity）中分配互不重叠的核集合
+
+    优先从单个 NUMA 节点中分配（选择空闲核数刚好够用的节点），
+    单个节点放不下时再从空闲核最多的节点依次凑齐。
+    """
+    def __init__(self, cpus=None, node_root="/sys/devices/system/node"):
+        cpus = sorted(cpus if cpus is not None else os.sched_getaffinity(0))
+        self.nodes = read_numa_nodes(cpus, node_root)
+        self.free = set(cpus)
+
+    @property
+    def total(self):
+        return sum(len(node) for node in self.nodes)
+
+    def available(self):
+        return len(self.free)
+
+    def allocate(self, n):
+        """分配 n 个核，返回排好序的 CPU 列表；空闲核不足时返回 None"""
+        n = min(n, self.total)
+        if n > len(self.free):
+            return None
+        free_by_node = [[cpu for cpu in node if cpu in self.free] for node in self.nodes]
+        fitting = [node for node in free_by_node if len(node) >= n]
+        if fitting:
+            chosen = min(fitting, key=len)[:n]
+        else:
+            chosen = []
+            for node in sorted(free_by_node, key=len, reverse=True):
+                chosen.extend(node[:n - len(chosen)])
+                if len(chosen) == n:
+                    break
+        self.free.difference_update(chosen)
+        return sorted(chosen)
+
+    def release(self, cpus):
+        self.free.update(cpus)
@@ -0,0 +1,89 @@
+import re
+import shlex
+import heapq
+from .JobMetrics import load_records
+
+_NUMBER = re.compile(r"^[+-]?(\d+\.?\d*|\.\d+)([eE][+-]?\d+)?$")
+
+
+def command_template(command, template_args=None):
+    """
+    把命令归约为模板，同一模板的任务被认为运行时间相近
+
+    template_args 为 None 时，把所有数值参数替换为 <n>（例如 --seed 3 与 --seed 7 属于同一模板）；
+    否则只保留脚本部分以及 template_args 中列出的选项及其取值，例如
+    template_args=["--dataset", "--model"]。
+    """
+    try:
+        tokens = shlex.split(command)
+    except ValueError:
+        tokens = command.split()
+    if template_args is None:
+        return " ".join("<n>" if _NUMBER.match(token) else token for token in tokens)
+
+    kept = []
+    i = 0
+    # 脚本部分：第一个选项之前的所有 token
+    while i < len(tokens) and not tokens[i].startswith("-"):
+        kept.append(tokens[i])
+        i += 1
+    while i < len(tokens):
+        name, eq, value = tokens[i].partition("=")
+        if name in template_args:
+            if eq:
+                kept.append(tokens[i])
+            elif i + 1 < len(tokens) and not tokens[i + 1].startswith("-"):
+                kept.extend(tokens[i:i + 2])
+                i += 1
+            else:
+                kept.append(name)
+        i += 1
+    return " ".join(kept)
+
+
+def lpt_makespan(durations, slots):
+    """最长处理时间优先（LPT）列表调度在 slots 个槽位上的完成时间"""
+    if not durations or slots <= 0:
+        return 0.0
+    finish = [0.0] * min(slots, len(durations))
+    for duration in sorted(durations, reverse=True):
+        heapq.heapreplace(finish, finish[0] + duration)
+    return max(finish)
+
+
+class DurationHistory:
+    """按命令模板记录历史运行时间（来自指标文件中成功结束的任务），用于预测新任务的运行时间"""
+    def __init__(self, metrics_file=None, template_args=None):
+        self.template_args = template_args
+        self._stats = {}  # template -> [总时间, 次数]
+        if metrics_file:
+            for record in load_records(metrics_file):
+                if record.get("exit_code") == 0 and "wall" in record:
+                    self.update(record["command"], record["wall"])
+
+    def template(self, command):
+        return command_template(command, self.template_args)
+
+    def update(self, command, wall):
+        stats = self._stats.setdefault(self.template(command), [0.0, 0])
+        stats[0] += wall
+        stats[1] += 1
+
+    def predict(self, command):
+        """返回该模板的平均运行时间；没有历史记录时返回 None"""
+        stats = self._stats.get(self.template(command))
+        if not stats:
+            return None
+        return stats[0] / stats[1]
+
+    def order(self, commands):
+        """
+        对一批命令排序：有历史记录的按预测时间从长到短，没有记录的保持原顺序排在其后
+
+        返回 (排序后的下标列表, 每个命令的预测时间)
+        """
+        predictions = [self.predict(command) for command in commands]
+        known = sorted((i for i, p in enumerate(predictions) if p is not None),
+                       key=lambda i: -predictions[i])
+        unknown = [i for i, p in enumerate(predictions) if p is None]
+        return known + unknown, predictions
@@ -0,0 +1,216 @@
+import os
+import sys
+import time
+import atexit
+import resource
+import importlib
+import threading
+import traceback
+import subprocess
+import multiprocessing
+import multiprocessing.util  # 先注册 multiprocessing 的退出钩子，保证 close() 的钩子在它之前运行
+from types import SimpleNamespace
+from .JobSubmitter import BaseJobSubmitter, job_label, open_job_log
+
+
+def _current_rss_kb():
+    """当前进程的常驻内存（kB）"""
+    try:
+        with open("/proc/self/statm", "r") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") // 1024
+    except (OSError, ValueError, IndexError):
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+def _run_task(task):
+    """在 worker 中执行一个任务，stdout/stderr 重定向到任务日志，返回退出码"""
+    with open_job_log(task["log"]) as out:
+        sys.stdout.flush()
+        sys.stderr.flush()
+        saved = os.dup(1), os.dup(2)
+        os.dup2(out.fileno(), 1)
+        os.dup2(out.fileno(), 2)
+        try:
+            if task.get("function"):
+                module_name, _, func_name = task["function"].partition(":")
+                func = getattr(importlib.import_module(module_name), func_name)
+                func(**task.get("kwargs", {}))
+                return 0
+            return subprocess.call(task["command"], shell=True)
+        except SystemExit as e:
+            return e.code if isinstance(e.code, int) else (0 if e.code is None else 1)
+        except Exception:
+            traceback.print_exc()
+            return 1
+        finally:
+            sys.stdout.flush()
+            sys.stderr.flush()
+            os.dup2(saved[0], 1)
+            os.dup2(saved[1], 2)
+            os.close(saved[0])
+            os.close(saved[1])
+
+
+def _worker_main(conn, env, max_tasks, max_rss_mb):
+    """常驻 worker：循环接收任务，执行满 max_tasks 个或内存超过 max_rss_mb 后退出等待替换"""
+    os.environ.update(env)
+    done = 0
+    while True:
+        try:
+            task = conn.recv()
+        except EOFError:
+            break
+        if task is None:
+            break
+        before = resource.getrusage(resource.RUSAGE_SELF), resource.getrusage(resource.RUSAGE_CHILDREN)
+        exit_code = _run_task(task)
+        after = resource.getrusage(resource.RUSAGE_SELF), resource.getrusage(resource.RUSAGE_CHILDREN)
+        done += 1
+        recycle = bool(max_tasks and done >= max_tasks) or \
+            bool(max_rss_mb and _current_rss_kb() > max_rss_mb * 1024)
+        conn.send({
+            "exit_code": exit_code,
+            "utime": sum(a.ru_utime - b.ru_utime for a, b in zip(after, before)),
+            "stime": sum(a.ru_stime - b.ru_stime for a, b in zip(after, before)),
+            "max_rss_kb": max(ru.ru_maxrss for ru in after),
+            "recycle": recycle,
+        })
+        if recycle:
+            break
+    conn.close()
+
+
+class _FunctionTask:
+    """worker 中执行的任务，提供与 Popen 相同的 args/pid/returncode 属性供日志和指标使用"""
+    def __init__(self, args, pid):
+        self.args = args
+        self.pid = pid
+        self.returncode = None
+
+
+class FunctionJobSubmitter(BaseJobSubmitter):
+    """
+    在常驻 Python worker 池中执行函数任务的提交器
+
+    队列中的任务可以是 {"function": "module:func", "kwargs": {...}}，也可以是普通 shell 命令。
+    worker 由 forkserver 启动，preload 中的模块（如 torch、sklearn）只在 forkserver 中导入一次，
+    避免每个任务都重新启动解释器和导入依赖。每个槽位（GPU ID 或并发序号）绑定一个 worker，
+    GPU 槽位的 worker 设置 CUDA_VISIBLE_DEVICES。
+
+    使用 forkserver 时主脚本需要放在 if __name__ == "__main__": 下。
+    worker 不是守护进程，任务中可以再启动子进程（如 DataLoader(num_workers>0)、joblib）；
+    submit() 结束时调用 close() 关闭 worker，解释器退出时 atexit 钩子兜底。
+    """
+    supports_functions = True
+
+    def __init__(self, file_prefix, gpu_ids=None, max_jobs=None, preload=(),
+                 max_tasks_per_worker=None, max_worker_rss_mb=None, **kwargs):
+        """
+        :param gpu_ids: 按 GPU 分配槽位，每张 GPU 一个 worker
+        :param max_jobs: 不使用 GPU 时的并发 worker 数，与 gpu_ids 二选一
+        :param preload: forkserver 中预先导入的模块名
+        :param max_tasks_per_worker: worker 执行该数量的任务后退出并被替换
+        :param max_worker_rss_mb: 任务结束后 worker 常驻内存超过该值（MB）时退出并被替换
+        """
+        super().__init__(file_prefix, **kwargs)
+        if (gpu_ids is None) == (max_jobs is None):
+            raise ValueError("gpu_ids 和 max_jobs 必须且只能指定一个")
+        self.gpu_ids = gpu_ids
+        slots = list(gpu_ids) if gpu_ids is not None else list(range(max_jobs))
+        self.workers = {slot: None for slot in slots}  # slot -> (process, conn)
+        self.tasks = {slot: None for slot in slots}    # slot -> 正在执行的 _FunctionTask
+        self.max_tasks_per_worker = max_tasks_per_worker
+        self.max_worker_rss_mb = max_worker_rss_mb
+        self.ctx = multiprocessing.get_context("forkserver")
+        if preload:
+            self.ctx.set_forkserver_preload(list(preload))
+        # 在 multiprocessing 自身的退出钩子（join 所有非守护子进程）之前运行，避免解释器退出时卡住
+        atexit.register(self.close)
+
+    def submit(self, repeat_last=False):
+        try:
+            super().submit(repeat_last=repeat_last)
+        finally:
+            self.close()
+
+    def close(self):
+        """通知所有 worker 退出"""
+        for slot, worker in self.workers.items():
+            if worker is None:
+                continue
+            process, conn = worker
+            try:
+                conn.send(None)
+            except (OSError, ValueError):
+                pass
+            process.join(timeout=10)
+            if process.is_alive():
+                process.terminate()
+                process.join()
+            conn.close()
+            self.workers[slot] = None
+
+    def _spawn(self, slot):
+        parent_conn, child_conn = self.ctx.Pipe()
+        env = {"CUDA_VISIBLE_DEVICES": str(slot)} if self.gpu_ids is not None else {}
+        process = self.ctx.Process(target=_worker_main,
+                                   args=(child_conn, env, self.max_tasks_per_worker, self.max_worker_rss_mb))
+        process.start()
+        child_conn.close()
+        self.workers[slot] = (process, parent_conn)
+        return self.workers[slot]
+
+    def _submit(self, command, slot, spec=None):
+        spec = spec or {}
+        worker = self.workers[slot]
+        if worker is None or not worker[0].is_alive():
+            worker = self._spawn(slot)
+        process, conn = worker
+
+        log_path = self._new_log_path()
+        task = _FunctionTask(job_label(command, spec), process.pid)
+        self._jobs[task] = self._new_job_info(log_path, slot, spec)
+        self.tasks[slot] = task
+        conn.send({"function": spec.get("function"), "kwargs": spec.get("kwargs", {}),
+                   "command": command, "log": log_path})
+        threading.Thread(target=self._await_result, args=(slot, task, worker), daemon=True).start()
+
+    def _await_result(self, slot, task, worker):
+        """等待 worker 返回结果；worker 异常退出时按其退出码记录"""
+        process, conn = worker
+        try:
+            result = conn.recv()
+        except (EOFError, OSError):
+            process.join()
+            result = {"exit_code": process.exitcode if process.exitcode is not None else -1, "recycle": True}
+        info = self._jobs.get(task)
+        if info is not None:
+            info["end"] = time.time()
+            if "utime" in result:
+                info["rusage"] = SimpleNamespace(ru_utime=result["utime"], ru_stime=result["stime"],
+                                                 ru_maxrss=result["max_rss_kb"])
+        if result.get("recycle"):
+            process.join()
+            self.workers[slot] = None
+        task.returncode = result["exit_code"]
+        self._notify_exit()
+
+    def _clean_resources(self):
+        for slot, task in self.tasks.items():
+            if task is not None and self._finished(task):
+                self._finish_job(task)
+                self.tasks[slot] = None
+
+    def _get_available_resource(self, spec=None):
+        self._clean_resources()
+        for slot, task in self.tasks.items():
+            if task is None:
+                return slot
+        return None
+
+    def _is_running(self):
+        self._clean_resources()
+        return any(task is not None for task in self.tasks.values())
+
+    def _slot_count(self):
+        return len(self.tasks)
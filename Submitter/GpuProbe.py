@@ -0,0 +1,53 @@
+import os
+import subprocess
+
+
+class NvidiaSmiProbe:
+    """
+    通过 nvidia-smi 查询每张 GPU 的显存（MiB）
+
+    调用返回 {gpu_index: {"total": MiB, "free": MiB}}；nvidia-smi 不可用时返回空字典。
+    测试中可以用任意返回相同结构的可调用对象替换。
+    """
+    def __init__(self, nvidia_smi="nvidia-smi", timeout=10):
+        self.nvidia_smi = nvidia_smi
+        self.timeout = timeout
+
+    def __call__(self):
+        try:
+            result = subprocess.run(
+                [self.nvidia_smi, "--query-gpu=index,memory.total,memory.free",
+                 "--format=csv,noheader,nounits"],
+                capture_output=True, text=True, timeout=self.timeout)
+        except (OSError, subprocess.TimeoutExpired):
+            return {}
+        if result.returncode != 0:
+            return {}
+        return parse_nvidia_smi(result.stdout)
+
+
+def parse_nvidia_smi(output):
+    """解析 'index, memory.total, memory.free' 格式的 csv 输出"""
+    gpus = {}
+    for line in output.strip().splitlines():
+        fields = [field.strip() for field in line.split(",")]
+        if len(fields) != 3:
+            continue
+        try:
+            index, total, free = (int(field) for field in fields)
+        except ValueError:
+            continue
+        gpus[index] = {"total": total, "free": free}
+    return gpus
+
+
+def discover_gpu_ids(probe=None):
+    """
+    发现本节点可用的 GPU：优先使用 CUDA_VISIBLE_DEVICES（Slurm 会按分配结果设置），
+    否则使用 nvidia-smi 列出的所有 GPU
+    """
+    visible = os.environ.get("CUDA_VISIBLE_DEVICES")
+    if visible is not None:
+        return [int(gpu) if gpu.strip().isdigit() else gpu.strip()
+                for gpu in visible.split(",") if gpu.strip()]
+    return sorted((probe or NvidiaSmiProbe())().keys())
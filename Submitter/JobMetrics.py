@@ -0,0 +1,134 @@
+import os
+import sys
+import json
+import time
+import atexit
+import threading
+
+
+class JobMetricsWriter:
+    """
+    任务指标的缓冲写入器：每个任务一行 JSON（JSONL）
+
+    记录先缓存在内存中，累计 flush_every 条或距上次写入超过 flush_interval 秒时，
+    以一次 O_APPEND 写入追加到文件，多个 submitter 共享同一文件时不会交错成半行。
+    """
+    def __init__(self, path, flush_every=64, flush_interval=5):
+        self.path = path
+        self.flush_every = flush_every
+        self.flush_interval = flush_interval
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._buffer = []
+        self._last_flush = time.time()
+        self._lock = threading.Lock()
+        atexit.register(self.flush)
+
+    def write(self, record):
+        with self._lock:
+            self._buffer.append(json.dumps(record, ensure_ascii=False) + "\n")
+            pending = len(self._buffer)
+        if pending >= self.flush_every or time.time() - self._last_flush >= self.flush_interval:
+            self.flush()
+
+    def flush(self):
+        with self._lock:
+            data, self._buffer = "".join(self._buffer), []
+            self._last_flush = time.time()
+        if not data:
+            return
+        fd = os.open(self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        try:
+            os.write(fd, data.encode())
+        finally:
+            os.close(fd)
+
+
+def load_records(path):
+    """读取指标文件中的所有记录，跳过损坏的行"""
+    records = []
+    if not os.path.exists(path):
+        return records
+    with open(path, "r") as f:
+        for line in f:
+            try:
+                records.append(json.loads(line))
+            except ValueError:
+                continue
+    return records
+
+
+def _merge_intervals(intervals):
+    merged = []
+    for start, end in sorted(intervals):
+        if merged and start <= merged[-1][1]:
+            merged[-1][1] = max(merged[-1][1], end)
+        else:
+            merged.append([start, end])
+    return merged
+
+
+def summarize(path):
+    """
+    汇总指标文件：吞吐量、槽位利用率、空闲间隙、排队等待和 CPU 时间
+
+    每个调度进程（host + worker_pid）单独统计利用率 = 任务总运行时间 / (槽位数 * 时间跨度)，
+    空闲间隙指该进程所有槽位都没有任务运行的时间段。
+    """
+    records = load_records(path)
+    if not records:
+        return {"jobs": 0}
+
+    workers = {}
+    for r in records:
+        workers.setdefault((r.get("host"), r.get("worker_pid")), []).append(r)
+
+    worker_stats = []
+    for (host, worker_pid), rs in workers.items():
+        start = min(r["start"] for r in rs)
+        end = max(r["end"] for r in rs)
+        span = max(end - start, 1e-9)
+        slots = max(r.get("slots") or 1 for r in rs)
+        busy = sum(r["wall"] for r in rs)
+        merged = _merge_intervals([(r["start"], r["end"]) for r in rs])
+        gaps = [b[0] - a[1] for a, b in zip(merged, merged[1:])]
+        worker_stats.append({
+            "host": host,
+            "worker_pid": worker_pid,
+            "jobs": len(rs),
+            "slots": slots,
+            "span": span,
+            "busy": busy,
+            "utilization": busy / (slots * span),
+            "idle_gaps": len(gaps),
+            "idle_total": sum(gaps),
+            "idle_max": max(gaps, default=0.0),
+        })
+
+    start = min(r["start"] for r in records)
+    end = max(r["end"] for r in records)
+    span = max(end - start, 1e-9)
+    capacity = sum(w["slots"] * w["span"] for w in worker_stats)
+    return {
+        "jobs": len(records),
+        "failed": sum(1 for r in records if r.get("exit_code") != 0),
+        "span": span,
+        "throughput_per_hour": len(records) / span * 3600,
+        "busy": sum(r["wall"] for r in records),
+        "utilization": sum(w["busy"] for w in worker_stats) / capacity,
+        "idle_total": sum(w["idle_total"] for w in worker_stats),
+        "idle_max": max(w["idle_max"] for w in worker_stats),
+        "queue_wait_mean": sum(r.get("queue_wait", 0.0) for r in records) / len(records),
+        "cpu_user": sum(r.get("utime") or 0.0 for r in records),
+        "cpu_sys": sum(r.get("stime") or 0.0 for r in records),
+        "max_rss_kb": max(r.get("max_rss_kb") or 0 for r in records),
+        "workers": worker_stats,
+    }
+
+
+if __name__ == "__main__":
+    # 用法: python -m Submitter.JobMetrics Submiter/metrics_{file_prefix}.jsonl
+    if len(sys.argv) != 2:
+        print("usage: python -m Submitter.JobMetrics <metrics.jsonl>")
+        sys.exit(1)
+    print(json.dumps(summarize(sys.argv[1]), indent=2, ensure_ascii=False))
@@ -1,18 +1,159 @@
 import time
 import subprocess
 import os
+import json
+import gzip
+import shutil
+import socket
+import threading
+import uuid
+from collections import deque
 from abc import ABC, abstractmethod
 from datetime import datetime
 from .SafeOffsetFileQueue import SafeOffsetFileQueue
+from .SegmentedFileQueue import SegmentedFileQueue
+from .JobMetrics import JobMetricsWriter, summarize
+from .GpuProbe import NvidiaSmiProbe, discover_gpu_ids
+from .CpuAllocator import CpuAllocator
+from .CompletionIndex import CompletionIndex
+from .DurationHistory import DurationHistory, lpt_makespan
 import toml
+
+_TASKSET = shutil.which("taskset")
+_LOG_WATCH_INTERVAL = 1  # 运行中任务日志大小的检查间隔（秒）
+
+
+def open_job_log(path):
+    """
+    以 O_APPEND 独占创建任务日志：已存在时报错而不是覆盖；
+    追加模式下日志被截断后任务的后续输出仍写到文件末尾，不会留下空洞
+    """
+    fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_EXCL | os.O_APPEND, 0o644)
+    return os.fdopen(fd, "wb")
+
+
+def trim_log(path, keep):
+    """只保留日志末尾 keep 字节（copytruncate 方式，任务可以继续写入）"""
+    with open(path, "a+b") as f:
+        f.seek(0, os.SEEK_END)
+        if f.tell() <= keep:
+            return
+        f.seek(-keep, os.SEEK_END)
+        tail = f.read()
+        f.truncate(0)
+        f.write(b"[... truncated ...]\n" + tail)
+
+
+def parse_job(line):
+    """
+    解析队列中的一条任务，返回 (command, spec)
+
+    普通行即 shell 命令，spec 为空字典；以 '{' 开头且能解析为 JSON 对象的行是带资源声明的任务，
+    例如 {"command": "python eval.py", "gpu_mem": 8000}。
+    函数任务 {"function": "module:func", "kwargs": {...}} 只能由 FunctionJobSubmitter 执行，
+    返回的 command 为 "module:func"。
+    """
+    if line.startswith("{"):
+        try:
+            spec = json.loads(line)
+        except ValueError:
+            spec = None
+        if _is_job_spec(spec):
+            return spec.get("command", spec.get("function")), spec
+    return line, {}
+
+
+def job_label(command, spec):
+    """任务在日志和指标中的名字：shell 任务为命令本身，函数任务为 "module:func {kwargs}" """
+    if spec.get("function"):
+        return f"{spec['function']} {json.dumps(spec.get('kwargs', {}), ensure_ascii=False)}"
+    return command
+
+
+def _is_job_spec(spec):
+    return isinstance(spec, dict) and (isinstance(spec.get("command"), str)
+                                       or isinstance(spec.get("function"), str))
+
+
 class BaseJobSubmitter(ABC):
     """抽象基类：定义任务提交和调度的接口"""
-    def __init__(self, file_prefix, logfile=None):
-        self.queue = SafeOffsetFileQueue(queue_file=f"{file_prefix}_queue.txt",offset_file=f"{file_prefix}_offset.txt")
-        self.logfile = logfile if logfile else f"Submiter/job_submitter_{file_prefix}.log"
+    # 是否能执行 {"function": "module:func"} 形式的函数任务；不支持的提交器会拒绝这类任务而不是当作 shell 命令执行
+    supports_functions = False
+
+    def __init__(self, file_prefix, logfile=None, queue_backend="file", segment_size=10000, prefetch=1,
+                 event_driven=True, poll_interval=5,
+                 job_log_dir=None, job_log_max_bytes=None, job_log_compress=False,
+                 metrics_file=None, admission=None, memoize=False,
+                 order="fifo", lookahead=None, template_args=None, worker_id=None):
+        """
+        :param queue_backend: "file" - 单文件队列 {file_prefix}_queue.txt；
+                              "segmented" - 分段队列目录 {file_prefix}_queue.d，已消费的段会被回收
+        :param segment_size: 分段队列每个段文件的任务数
+        :param prefetch: 每次从队列认领的任务数，缓存在本地依次执行，以减少加锁次数
+        :param event_driven: True - 子进程退出后立即唤醒调度；
+                             False - 调度循环每隔 poll_interval 秒检查一次。
+                             两种模式下子进程都由独立线程 os.wait4 回收，结束时间和 rusage 是准确的
+        :param poll_interval: 等待资源/任务时的最长等待秒数（事件模式下也会按此间隔重新读取配置）
+        :param job_log_dir: 每个任务的 stdout/stderr 直接写入该目录下独立的日志文件，
+                            默认 Submiter/job_logs/{file_prefix}
+        :param job_log_max_bytes: 日志大小上限。运行中由后台线程每秒检查，超过上限时截断为末尾一半；
+                                  任务结束后再截断为末尾 job_log_max_bytes 字节
+        :param job_log_compress: 任务结束后将日志 gzip 压缩
+        :param metrics_file: 每个结束的任务追加一行 JSON 指标记录，默认 Submiter/metrics_{file_prefix}.jsonl
+        :param admission: AdmissionController 实例；节点内存/负载/PSI 压力越过阈值时暂停启动新任务
+        :param memoize: 跳过已成功完成过的任务，完成索引位于 {file_prefix}_done 目录
+        :param order: "fifo" - 按队列顺序执行；
+                      "lpt" - 每次认领 lookahead 条任务，按历史运行时间（来自 metrics_file）从长到短执行，
+                      没有历史记录的任务按原顺序排在后面
+        :param lookahead: lpt 模式每次认领的任务数，None 表示槽位数的 4 倍。认领的任务不会归还队列，
+                          多个 worker 共享队列时过大的值会让一个 worker 囤积任务、其他 worker 空闲
+        :param template_args: 归并历史运行时间时保留的选项名，None 表示把数值参数视为同一模板
+        :param worker_id: 多个 submitter（如多节点的 Slurm worker）共享同一 file_prefix 时区分各自的
+                          日志和配置文件
+        """
+        if queue_backend == "file":
+            self.queue = SafeOffsetFileQueue(queue_file=f"{file_prefix}_queue.txt",offset_file=f"{file_prefix}_offset.txt")
+        elif queue_backend == "segmented":
+            self.queue = SegmentedFileQueue(queue_dir=f"{file_prefix}_queue.d", segment_size=segment_size)
+        else:
+            raise ValueError(f"未知的 queue_backend: {queue_backend}")
+        self.prefetch = max(1, prefetch)
+        self._prefetched = deque()
+        self.event_driven = event_driven
+        self.poll_interval = poll_interval
+        self._exit_cond = threading.Condition()
+        self._exited = 0
+        self.worker_id = worker_id
+        suffix = f"_{worker_id}" if worker_id is not None else ""
+        self.logfile = logfile if logfile else f"Submiter/job_submitter_{file_prefix}{suffix}.log"
         os.makedirs(os.path.dirname(self.logfile), exist_ok=True)
         if os.path.exists(self.logfile):
             os.remove(self.logfile)
+        self.job_log_dir = job_log_dir if job_log_dir else f"Submiter/job_logs/{file_prefix}"
+        os.makedirs(self.job_log_dir, exist_ok=True)
+        self.job_log_max_bytes = job_log_max_bytes
+        self.job_log_compress = job_log_compress
+        self._log_trim_lock = threading.Lock()
+        if job_log_max_bytes:
+            threading.Thread(target=self._watch_job_logs, daemon=True).start()
+        self._job_seq = 0
+        self._jobs = {}  # proc -> 任务信息
+        self.metrics_file = metrics_file if metrics_file else f"Submiter/metrics_{file_prefix}.jsonl"
+        self.metrics = JobMetricsWriter(self.metrics_file)
+        self._dequeued_at = None
+        self.admission = admission
+        self.completion_index = CompletionIndex(f"{file_prefix}_done") if memoize else None
+        self._memo_key = None
+        self._memo_inputs = None
+        if order not in ("fifo", "lpt"):
+            raise ValueError(f"未知的 order: {order}")
+        self.lookahead = lookahead
+        self.history = DurationHistory(self.metrics_file, template_args) if order == "lpt" else None
+        self._predicted = None
+        self._predicted_makespan = 0.0
+        self._ordered_jobs = 0  # lpt 模式认领的任务数
+        self._predicted_jobs = 0  # 其中有历史记录的任务数
+        self._first_start = None
 
     def truncate(self, num_items):
         self.queue.truncate(num_items)
@@ -21,20 +162,53 @@ class BaseJobSubmitter(ABC):
     def addJobs(self, commands):
         """
         批量添加任务到文件队列中
-        :param commands: list[str] - 命令字符串列表
+        :param commands: list[str | dict] - 命令字符串列表；dict 形式的任务需包含 "command"
+                         （或函数任务的 "function"），其余键为资源声明（如 "gpu_mem"），以 JSON 行写入队列
         """
         if not isinstance(commands, (list, tuple)):
             raise TypeError("commands 必须是列表或元组类型。")
 
-        added = 0
+        valid = []
         for cmd in commands:
+            if _is_job_spec(cmd):
+                cmd = json.dumps(cmd, ensure_ascii=False)
             if not isinstance(cmd, str):
                 self._log(f"⚠️ 忽略非法任务（非字符串类型）: {cmd}")
                 continue
-            self.queue.put(cmd)
-            added += 1
-
-        self._log(f"🧾 成功添加 {added} 条任务到队列中。")
+            valid.append(cmd)
+        self.queue.put_many(valid)
+
+        self._log(f"🧾 成功添加 {len(valid)} 条任务到队列中。")
+
+    def _next_command(self):
+        """从本地预取缓存中取任务，缓存为空时从队列批量认领"""
+        if not self._prefetched:
+            now = time.time()
+            if self.history is None:
+                items = self.queue.get_many(self.prefetch)
+            else:
+                lookahead = self.lookahead if self.lookahead is not None else 4 * (self._slot_count() or 1)
+                items = self._order_by_history(self.queue.get_many(max(self.prefetch, lookahead)))
+            self._prefetched.extend((item, now) for item in items)
+        if not self._prefetched:
+            return None
+        command, self._dequeued_at = self._prefetched.popleft()
+        return command
+
+    def _order_by_history(self, items):
+        """按历史运行时间对一批任务做 LPT 排序，并累计预测的完成时间（只统计含有历史记录任务的批次）"""
+        if not items:
+            return items
+        labels = [job_label(*parse_job(item)) for item in items]
+        indices, predictions = self.history.order(labels)
+        known = [p for p in predictions if p is not None]
+        self._ordered_jobs += len(items)
+        self._predicted_jobs += len(known)
+        if known:
+            default = sum(known) / len(known)
+            self._predicted_makespan += lpt_makespan(
+                [p if p is not None else default for p in predictions], self._slot_count() or 1)
+        return [items[i] for i in indices]
 
     def submit(self, repeat_last=False):
         """
@@ -43,44 +217,268 @@ class BaseJobSubmitter(ABC):
         :param repeat_last: bool
         """
 
+        if self.worker_id is not None and self.queue.empty():
+            # 多 worker 共享队列时，晚启动的 worker 可能发现队列已被取空，正常退出即可
+            self._log("队列为空，worker 退出。")
+            return
         assert not self.queue.empty(), "提交失败，任务为空"
         last_command = None
 
         while True:
-            command = self.queue.get()
+            command = self._next_command()
+            repeated = False
 
             if command is None:
                 if repeat_last and last_command is not None:
                     # 队列空了，但需要重复最后一条任务
                     command = last_command
+                    self._dequeued_at = time.time()
+                    repeated = True
                 else:
                     # 不重复 → 进入正常清理流程
                     if self._is_running():
-                        time.sleep(5)
+                        self._wait_for_exit(self.poll_interval)
                         continue
                     break
 
+            job_command, spec = parse_job(command)
+            if spec.get("function") and not self.supports_functions:
+                self._log(f"[error][command: {job_command}][{type(self).__name__} 不支持函数任务，请使用 FunctionJobSubmitter]")
+                continue
+
             # 保存最后一条任务
             last_command = command
 
+            self._predicted = self.history.predict(job_label(job_command, spec)) if self.history else None
+
+            # 已成功完成过的任务直接跳过（重复执行的最后一条任务除外）
+            self._memo_key = None
+            if self.completion_index is not None and not repeated:
+                self._memo_key = self.completion_index.key(job_command, spec)
+                self._memo_inputs = self.completion_index.fingerprint(spec)
+                if self.completion_index.lookup(self._memo_key, self._memo_inputs) is not None:
+                    self._log(f"[cached][command: {job_command}]")
+                    continue
+
             # 等待资源可用
-            while self._get_available_resource() is None:
-                time.sleep(5)
+            resource = self._get_available_resource(spec)
+            while resource is None or not self._admit():
+                self._wait_for_exit(self.poll_interval)
+                resource = self._get_available_resource(spec)
 
-            resource = self._get_available_resource()
-            self._submit(command, resource)
+            self._submit(job_command, resource, spec)
 
         if not repeat_last:
             while self._is_running():
-                time.sleep(6)
+                self._wait_for_exit(self.poll_interval)
+            self.metrics.flush()
+            if self.history is not None and self._first_start is not None:
+                actual = time.time() - self._first_start
+                if self._predicted_jobs:
+                    self._log(f"[schedule] predicted makespan: {self._predicted_makespan:.1f}s "
+                              f"(history for {self._predicted_jobs}/{self._ordered_jobs} jobs), actual: {actual:.1f}s")
+                else:
+                    self._log(f"[schedule] predicted makespan: unavailable (no history for "
+                              f"{self._ordered_jobs} jobs), actual: {actual:.1f}s")
             self._log("✅ All jobs are done.")
 
+    def invalidate(self, commands=None):
+        """
+        从完成索引中删除记录，使这些任务下次会重新执行
+        :param commands: list[str | dict]，None 表示清空整个索引
+        """
+        if self.completion_index is None:
+            return
+        if commands is None:
+            self.completion_index.clear()
+            return
+        for cmd in commands:
+            if isinstance(cmd, dict):
+                cmd = json.dumps(cmd, ensure_ascii=False)
+            self.completion_index.invalidate(self.completion_index.key(*parse_job(cmd)))
+
+    def summary(self):
+        """汇总本 file_prefix 的任务指标：吞吐量、槽位利用率、空闲间隙等"""
+        self.metrics.flush()
+        return summarize(self.metrics_file)
+
+    def _admit(self):
+        """准入控制：压力过高时返回 False，并在限流开始/解除时记录日志"""
+        if self.admission is None:
+            return True
+        allowed, message = self.admission.admit()
+        if message:
+            self._log(message)
+        return allowed
+
+    def _launch(self, command, env=None, resource=None, spec=None, cpus=None):
+        """
+        启动任务，stdout/stderr 直接重定向到该任务自己的日志文件
+        :param cpus: 绑定的 CPU 列表，通过 taskset 在 exec 前绑核，并设置对应的线程数环境变量。
+                     不使用 preexec_fn：回收线程存在时 fork 后执行 Python 代码可能死锁
+        """
+        log_path = self._new_log_path()
+        args, shell = command, True
+        if cpus:
+            env = dict(env if env is not None else os.environ)
+            for name in ("OMP_NUM_THREADS", "MKL_NUM_THREADS", "OPENBLAS_NUM_THREADS"):
+                env[name] = str(len(cpus))
+            if _TASKSET:
+                args, shell = [_TASKSET, "-c", ",".join(map(str, cpus)), "/bin/sh", "-c", command], False
+        with open_job_log(log_path) as out:
+            proc = subprocess.Popen(args, shell=shell, env=env,
+                                    stdout=out, stderr=subprocess.STDOUT)
+        if cpus and not _TASKSET:
+            # 没有 taskset 时退而在启动后绑核，shell 在此之前派生的子进程不受约束
+            try:
+                os.sched_setaffinity(proc.pid, cpus)
+            except ProcessLookupError:
+                pass
+        self._jobs[proc] = self._new_job_info(log_path, resource, spec, cpus)
+        self._jobs[proc]["command"] = command
+        self._watch(proc)
+        return proc
+
+    def _new_job_info(self, log_path, resource, spec=None, cpus=None):
+        start = time.time()
+        if self._first_start is None:
+            self._first_start = start
+        return {"log": log_path, "resource": resource, "spec": spec or {}, "cpus": cpus,
+                "dequeued_at": self._dequeued_at, "memo_key": self._memo_key,
+                "memo_inputs": self._memo_inputs,
+                "predicted": self._predicted, "start": start}
+
+    def _new_log_path(self):
+        """
+        日志文件名包含主机名、进程号、启动时间和随机后缀：不同运行、不同节点复用同一 pid 时也不会重名，
+        调用方以 open_job_log 独占创建，绝不覆盖已有日志
+        """
+        self._job_seq += 1
+        started = datetime.now().strftime("%Y%m%d-%H%M%S")
+        return os.path.join(self.job_log_dir,
+                            f"{socket.gethostname()}_{os.getpid()}_{started}_{self._job_seq:06d}_{uuid.uuid4().hex[:8]}.log")
+
+    def _finish_job(self, proc):
+        """记录已退出任务的结果，并在后台处理其日志文件"""
+        info = self._jobs.pop(proc, {})
+        command = info.get("command", proc.args)
+        log_path = info.get("log")
+        if log_path and self.job_log_compress:
+            log_path += ".gz"
+        level = "info" if proc.returncode == 0 else "error"
+        self._log(f"[{level}][command: {command}][log: {log_path}]")
+        self._write_metrics(proc, info, log_path)
+        if proc.returncode == 0 and self.history is not None and "end" in info:
+            self.history.update(command, info["end"] - info["start"])
+        if proc.returncode == 0 and info.get("memo_key") and self.completion_index is not None:
+            self.completion_index.record(info["memo_key"], command, info["spec"].get("outputs"),
+                                         info.get("memo_inputs"))
+        if info.get("log") and (self.job_log_max_bytes or self.job_log_compress):
+            # 非守护线程：解释器退出前会等待压缩完成，避免留下损坏的文件
+            threading.Thread(target=self._finalize_job_log, args=(info["log"],)).start()
+
+    def _write_metrics(self, proc, info, log_path):
+        start = info.get("start", time.time())
+        end = info.get("end", time.time())
+        dequeued_at = info.get("dequeued_at") or start
+        rusage = info.get("rusage")
+        self.metrics.write({
+            "command": info.get("command", proc.args),
+            "host": socket.gethostname(),
+            "worker_pid": os.getpid(),
+            "pid": proc.pid,
+            "resource": info.get("resource"),
+            "cpus": info.get("cpus"),
+            "slots": self._slot_count(),
+            "dequeued_at": dequeued_at,
+            "start": start,
+            "end": end,
+            "queue_wait": start - dequeued_at,
+            "wall": end - start,
+            "predicted_wall": info.get("predicted"),
+            "utime": rusage.ru_utime if rusage else None,
+            "stime": rusage.ru_stime if rusage else None,
+            "max_rss_kb": rusage.ru_maxrss if rusage else None,
+            "exit_code": proc.returncode,
+            "log": log_path,
+        })
+
+    def _slot_count(self):
+        """当前可用的槽位总数，用于计算利用率"""
+        return None
+
+    def _watch_job_logs(self):
+        """后台线程：运行中任务的日志超过 job_log_max_bytes 时截断为末尾一半，避免输出很多的任务写满磁盘"""
+        while True:
+            time.sleep(_LOG_WATCH_INTERVAL)
+            for info in list(self._jobs.values()):
+                log_path = info.get("log")
+                try:
+                    if log_path and os.path.getsize(log_path) > self.job_log_max_bytes:
+                        with self._log_trim_lock:
+                            trim_log(log_path, self.job_log_max_bytes // 2)
+                except OSError:
+                    # 任务刚结束，日志已被压缩删除
+                    pass
+
+    def _finalize_job_log(self, log_path):
+        """按大小截断（保留末尾）并可选压缩任务日志"""
+        if self.job_log_max_bytes:
+            with self._log_trim_lock:
+                trim_log(log_path, self.job_log_max_bytes)
+        if self.job_log_compress:
+            with open(log_path, "rb") as src, gzip.open(log_path + ".gz", "wb") as dst:
+                shutil.copyfileobj(src, dst)
+            os.remove(log_path)
+
+    def _watch(self, proc):
+        """为子进程启动回收线程；轮询模式也需要它在退出时刻记录结束时间，否则 wall/利用率按轮询间隔失真"""
+        threading.Thread(target=self._reap, args=(proc,), daemon=True).start()
+
+    def _reap(self, proc):
+        """阻塞等待子进程退出，写回 returncode 并唤醒调度循环"""
+        try:
+            _, status, rusage = os.wait4(proc.pid, 0)
+            self._record_exit(proc, status, rusage)
+        except ChildProcessError:
+            # 退出状态已被别处回收而丢失；Popen.wait() 此时会返回 0，按失败记录以免被当作成功写入完成索引
+            if proc.returncode is None:
+                proc.returncode = -1
+        self._notify_exit()
+
+    def _notify_exit(self):
+        with self._exit_cond:
+            self._exited += 1
+            self._exit_cond.notify_all()
+
+    def _record_exit(self, proc, status, rusage):
+        """保存结束时间和 rusage，最后写 returncode（调度线程以它判断任务已结束）"""
+        info = self._jobs.get(proc)
+        if info is not None:
+            info["end"] = time.time()
+            info["rusage"] = rusage
+        proc.returncode = os.waitstatus_to_exitcode(status)
+
+    def _finished(self, proc):
+        """子进程是否已退出（由回收线程写回 returncode）"""
+        return proc.returncode is not None
+
+    def _wait_for_exit(self, timeout):
+        """等待任一子进程退出或超时"""
+        if not self.event_driven:
+            time.sleep(timeout)
+            return
+        with self._exit_cond:
+            if self._exited == 0:
+                self._exit_cond.wait(timeout)
+            self._exited = 0
+
     @abstractmethod
-    def _get_available_resource(self):
+    def _get_available_resource(self, spec=None):
         pass
 
     @abstractmethod
-    def _submit(self, command, resource):
+    def _submit(self, command, resource, spec=None):
         pass
 
     @abstractmethod
@@ -101,59 +499,117 @@ class BaseJobSubmitter(ABC):
 # GPU 调度器
 # ===========================================================
 class CudaJobSubmitter(BaseJobSubmitter):
-    """基于 GPU 的任务提交器，按 GPU ID 调度任务"""
-    def __init__(self, file_prefix, gpu_ids):
-        super().__init__(file_prefix)
-        self.cuda_processes = {gpu_id: None for gpu_id in gpu_ids}
+    """
+    基于 GPU 的任务提交器，按 GPU ID 调度任务
+
+    每张 GPU 最多同时运行 slots_per_gpu 个任务。任务可通过 {"command": ..., "gpu_mem": MiB}
+    声明显存需求，此时只会放到 探测到的空闲显存 - 已分配给本提交器运行中任务的显存 足够的 GPU 上。
+    刚启动的任务可能还没申请显存，探测结果看不到它，因此总是扣除全部已分配的显存；
+    任务真正占用显存后会被重复扣除，放置偏保守，但不会超额分配。
+    """
+    def __init__(self, file_prefix, gpu_ids=None, slots_per_gpu=1, memory_probe=None, placement="pack", **kwargs):
+        """
+        :param gpu_ids: 使用的 GPU ID 列表；None 表示从 CUDA_VISIBLE_DEVICES 或 nvidia-smi 自动发现
+        :param slots_per_gpu: 每张 GPU 的并发任务数
+        :param memory_probe: 返回 {gpu_index: {"total": MiB, "free": MiB}} 的可调用对象，默认解析 nvidia-smi
+        :param placement: "pack" - 优先放到已有任务的 GPU 上，放不下再换下一张；
+                          "spread" - 优先放到任务最少的 GPU 上
+        """
+        super().__init__(file_prefix, **kwargs)
+        if placement not in ("pack", "spread"):
+            raise ValueError(f"未知的 placement: {placement}")
+        self.slots_per_gpu = slots_per_gpu
+        self.memory_probe = memory_probe
+        self.placement = placement
+        if gpu_ids is None:
+            gpu_ids = discover_gpu_ids(memory_probe)
+            self._log(f"发现 GPU: {gpu_ids}")
+        self.cuda_processes = {gpu_id: [] for gpu_id in gpu_ids}
         # save gpu_id to config
-        self.config = f"Submiter/slurm_logs/{file_prefix}_gpu_config.toml"
+        suffix = f"_{self.worker_id}" if self.worker_id is not None else ""
+        self.config = f"Submiter/slurm_logs/{file_prefix}_gpu_config{suffix}.toml"
         if not os.path.exists("Submiter/slurm_logs"):
             os.makedirs("Submiter/slurm_logs")
         with open(self.config, "w") as f:
-            toml.dump({"gpu_ids": gpu_ids}, f)
+            toml.dump({"gpu_ids": gpu_ids, "slots_per_gpu": slots_per_gpu}, f)
 
     def _clean_resources(self):
-        for gpu_id, proc in self.cuda_processes.items():
-            if proc is not None and proc.poll() is not None:
-                if proc.returncode == 0:
-                    self._log(f"[info][command: {proc.args}]")
-                else:
-                    self._log(f"[error][command: {proc.args}]")
-                self.cuda_processes[gpu_id] = None
-
-    def _get_available_resource(self):
+        for gpu_id, procs in self.cuda_processes.items():
+            for proc in list(procs):
+                if self._finished(proc):
+                    self._finish_job(proc)
+                    procs.remove(proc)
+
+    def _reserved_mem(self, gpu_id):
+        """已分配给该 GPU 上运行中任务的显存"""
+        return sum(self._jobs.get(proc, {}).get("spec", {}).get("gpu_mem", 0)
+                   for proc in self.cuda_processes[gpu_id])
+
+    def _get_available_resource(self, spec=None):
         self._clean_resources()
         with open(self.config, "r") as f:
             config_data = toml.load(f)
         gpu_ids = config_data.get("gpu_ids", [])
-        self.cuda_processes = {gpu_id: self.cuda_processes.get(gpu_id, None) for gpu_id in gpu_ids}
-        for gpu_id, proc in self.cuda_processes.items():
-            if proc is None:
-                return gpu_id
-        return None
+        self.slots_per_gpu = config_data.get("slots_per_gpu", self.slots_per_gpu)
+        self.cuda_processes = {gpu_id: self.cuda_processes.get(gpu_id, []) for gpu_id in gpu_ids}
+
+        candidates = [gpu_id for gpu_id, procs in self.cuda_processes.items()
+                      if len(procs) < self.slots_per_gpu]
+        gpu_mem = (spec or {}).get("gpu_mem")
+        free = {}
+        if gpu_mem and candidates:
+            if self.memory_probe is None:
+                self.memory_probe = NvidiaSmiProbe()
+            memory = {str(index): info for index, info in self.memory_probe().items()}
+            if memory:
+                for gpu_id in candidates:
+                    info = memory.get(str(gpu_id))
+                    if info is not None:
+                        free[gpu_id] = info["free"] - self._reserved_mem(gpu_id)
+                candidates = [gpu_id for gpu_id in candidates if free.get(gpu_id, gpu_mem) >= gpu_mem]
+        if not candidates:
+            return None
+
+        if self.placement == "pack":
+            # 任务最多、剩余显存最少的 GPU 优先
+            return min(candidates, key=lambda g: (-len(self.cuda_processes[g]), free.get(g, 0)))
+        return min(candidates, key=lambda g: (len(self.cuda_processes[g]), -free.get(g, 0)))
 
     def _is_running(self):
         self._clean_resources()
-        return any(proc is not None for proc in self.cuda_processes.values())
+        return any(procs for procs in self.cuda_processes.values())
 
-    def _submit(self, command, gpu_id):
+    def _submit(self, command, gpu_id, spec=None):
         env = os.environ.copy()
         env['CUDA_VISIBLE_DEVICES'] = str(gpu_id)
-        proc = subprocess.Popen(command, shell=True, env=env,
-                                stdout=subprocess.PIPE, stderr=subprocess.STDOUT)
-        self.cuda_processes[gpu_id] = proc
+        self.cuda_processes[gpu_id].append(self._launch(command, env=env, resource=gpu_id, spec=spec))
+
+    def _slot_count(self):
+        return len(self.cuda_processes) * self.slots_per_gpu
 
 
 # ===========================================================
 # 并发任务提交器
 # ===========================================================
 class ConcurrentJobSubmitter(BaseJobSubmitter):
-    """限制最大并发任务数的任务提交器"""
-    def __init__(self, file_prefix, max_jobs):
-        super().__init__(file_prefix)
+    """
+    限制最大并发任务数的任务提交器
+
+    设置 cores_per_job（或任务以 {"command": ..., "cores": n} 声明）时，每个任务会独占一组
+    互不重叠的 CPU（优先同一 NUMA 节点），并设置相同数量的 OMP/MKL/OpenBLAS 线程数；未声明核数的任务不绑核。
+    """
+    def __init__(self, file_prefix, max_jobs, cores_per_job=None, cpu_allocator=None, **kwargs):
+        """
+        :param cores_per_job: 每个任务默认绑定的核数，None 表示不绑核
+        :param cpu_allocator: CpuAllocator 实例，默认使用 sched_getaffinity 和 /sys/devices/system/node
+        """
+        super().__init__(file_prefix, **kwargs)
         self.max_jobs = max_jobs
+        self.cores_per_job = cores_per_job
+        self.cpu_allocator = cpu_allocator if cpu_allocator else CpuAllocator()
         self.processes = []
-        self.config = f"Submiter/slurm_logs/{file_prefix}_cpu_config.toml"
+        suffix = f"_{self.worker_id}" if self.worker_id is not None else ""
+        self.config = f"Submiter/slurm_logs/{file_prefix}_cpu_config{suffix}.toml"
         if not os.path.exists("Submiter/slurm_logs"):
             os.makedirs("Submiter/slurm_logs")
         with open(self.config, "w") as f:
@@ -162,30 +618,39 @@ class ConcurrentJobSubmitter(BaseJobSubmitter):
 
     def _clean_resources(self):
         for proc in list(self.processes):
-            if proc.poll() is not None:
-                if proc.returncode == 0:
-                    self._log(f"[info][command: {proc.args}]")
-                else:
-                    self._log(f"[error][command: {proc.args}]")
+            if self._finished(proc):
+                cpus = self._jobs.get(proc, {}).get("cpus")
+                if cpus:
+                    self.cpu_allocator.release(cpus)
+                self._finish_job(proc)
                 self.processes.remove(proc)
 
-    def _get_available_resource(self):
+    def _cores(self, spec):
+        return (spec or {}).get("cores", self.cores_per_job)
+
+    def _get_available_resource(self, spec=None):
         self._clean_resources()
         with open(self.config, "r") as f:
             config_data = toml.load(f)
         self.max_jobs = config_data.get("max_jobs", self.max_jobs)
-        if len(self.processes) < self.max_jobs:
-            return len(self.processes)
-        return None
+        if len(self.processes) >= self.max_jobs:
+            return None
+        cores = self._cores(spec)
+        if cores and self.cpu_allocator.available() < min(cores, self.cpu_allocator.total):
+            return None
+        return len(self.processes)
 
     def _is_running(self):
         self._clean_resources()
         return len(self.processes) > 0
 
-    def _submit(self, command, resource):
-        proc = subprocess.Popen(command, shell=True,
-                                stdout=subprocess.PIPE, stderr=subprocess.STDOUT)
-        self.processes.append(proc)
+    def _submit(self, command, resource, spec=None):
+        cores = self._cores(spec)
+        cpus = self.cpu_allocator.allocate(cores) if cores else None
+        self.processes.append(self._launch(command, resource=resource, spec=spec, cpus=cpus))
+
+    def _slot_count(self):
+        return self.max_jobs
     
 if __name__ == "__main__":
     # 示例用法
@@ -14,7 +14,12 @@ def file_lock(file):
 
 
 class SafeOffsetFileQueue:
-    """基于偏移量指针 + 文件锁的多进程安全队列"""
+    """
+    基于偏移量指针 + 文件锁的多进程安全队列
+
+    偏移量文件格式为 "<已消费行数> <字节位置>"，get() 直接 seek 到字节位置读取一行，
+    不再每次 readlines() 整个队列文件。旧版本只记录行数的偏移量文件会在首次读取时自动迁移。
+    """
     def __init__(self, queue_file="queue.txt", offset_file="offset.txt"):
         self.queue_file = queue_file
         self.offset_file = offset_file
@@ -22,66 +27,112 @@ class SafeOffsetFileQueue:
             open(self.queue_file, "w").close()
         if not os.path.exists(self.offset_file):
             with open(self.offset_file, "w") as f:
-                f.write("0")
+                f.write("0 0")
+
+    def _line_to_byte(self, num_lines):
+        """扫描队列文件，返回前 num_lines 行之后的 (行号, 字节位置)"""
+        index, pos = 0, 0
+        with open(self.queue_file, "rb") as qf:
+            while index < num_lines:
+                line = qf.readline()
+                if not line.endswith(b"\n"):
+                    break
+                index += 1
+                pos += len(line)
+        return index, pos
+
+    def _read_offset(self, ofs):
+        """读取偏移量 (行号, 字节位置)，兼容旧的纯行号格式（调用方需持有 ofs 的锁）"""
+        ofs.seek(0)
+        fields = ofs.read().split()
+        if len(fields) >= 2:
+            return int(fields[0]), int(fields[1])
+        # 旧格式：只有行号，一次性换算为字节位置并写回
+        index, pos = self._line_to_byte(int(fields[0]) if fields else 0)
+        self._write_offset(ofs, index, pos)
+        return index, pos
+
+    @staticmethod
+    def _write_offset(ofs, index, pos):
+        ofs.seek(0)
+        ofs.write(f"{index} {pos}")
+        ofs.truncate()
+        ofs.flush()
 
     def put(self, item):
         """入队：追加到文件末尾"""
+        self.put_many([item])
+
+    def put_many(self, items):
+        """批量入队：一次加锁、一次写入追加所有任务"""
+        if not items:
+            return
         with open(self.queue_file, "a") as f:
             with file_lock(f):
-                f.write(item + "\n")
+                f.write("".join(item + "\n" for item in items))
 
     def get(self):
         """出队：根据偏移量读取一条新任务并更新指针"""
-        # 先锁 offset 文件，确保只有一个进程读取更新偏移量
+        items = self.get_many(1)
+        return items[0] if items else None
+
+    def get_many(self, k):
+        """批量出队：在一次临界区内认领最多 k 条连续任务，没有新任务时返回空列表"""
+        # 锁 offset 文件，确保只有一个进程读取更新偏移量；truncate 同样持有该锁，
+        # 而 put 只在文件末尾追加完整的行，因此读取时无需再锁任务文件
         with open(self.offset_file, "r+") as ofs:
             with file_lock(ofs):
-                offset = int(ofs.read().strip() or 0)
-
-                # 再锁任务文件，读取当前任务
-                with open(self.queue_file, "r") as qf:
-                    with file_lock(qf):
-                        lines = qf.readlines()
+                index, pos = self._read_offset(ofs)
 
-                if offset >= len(lines):
-                    return None  # 没有新任务
+                items = []
+                with open(self.queue_file, "rb") as qf:
+                    qf.seek(pos)
+                    while len(items) < k:
+                        line = qf.readline()
+                        if not line.endswith(b"\n"):
+                            break  # 没有新任务（或最后一行尚未写完）
+                        items.append(line.decode().strip())
+                        pos += len(line)
 
-                item = lines[offset].strip()
+                if items:
+                    self._write_offset(ofs, index + len(items), pos)
+                return items
 
-                # 更新偏移量
-                ofs.seek(0)
-                ofs.write(str(offset + 1))
-                ofs.truncate()
-
-                return item
+    def qsize(self):
+        """未消费的任务数：从当前字节位置数到文件末尾的完整行数"""
+        with open(self.offset_file, "r+") as ofs:
+            with file_lock(ofs):
+                _, pos = self._read_offset(ofs)
+        count = 0
+        with open(self.queue_file, "rb") as qf:
+            qf.seek(pos)
+            for chunk in iter(lambda: qf.read(1 << 20), b""):
+                count += chunk.count(b"\n")
+        return count
 
     def empty(self):
         """判断是否还有未处理任务"""
-        with open(self.offset_file, "r") as ofs:
-            offset = int(ofs.read().strip() or 0)
-        with open(self.queue_file, "r") as qf:
-            lines = qf.readlines()
-        return offset >= len(lines)
+        with open(self.offset_file, "r+") as ofs:
+            with file_lock(ofs):
+                _, pos = self._read_offset(ofs)
+        return pos >= os.path.getsize(self.queue_file)
     
     def truncate(self, num_items: int = 0):
         """
         截断队列，保留前 num_items 条任务，并更新偏移量。
         """
-        # 更新偏移量
+        # 全程持有 offset 锁，避免 get() 读到截断过程中的文件
         with open(self.offset_file, "r+") as ofs:
             with file_lock(ofs):
-                current_offset = int(ofs.read().strip() or 0)
-                new_offset = min(current_offset, num_items)
-                ofs.seek(0)
-                ofs.write(str(new_offset))
-                ofs.truncate()
-                
-        # 先锁队列文件
-        with open(self.queue_file, "r+") as qf:
-            with file_lock(qf):
-                lines = qf.readlines()
-                qf.seek(0)
-                qf.writelines(lines[:num_items])
-                qf.truncate()  # 截掉多余内容
-
-        
+                current_index, _ = self._read_offset(ofs)
+
+                # 再锁队列文件
+                with open(self.queue_file, "r+b") as qf:
+                    with file_lock(qf):
+                        lines = qf.readlines()
+                        qf.seek(0)
+                        qf.writelines(lines[:num_items])
+                        qf.truncate()  # 截掉多余内容
 
+                new_index = min(current_index, num_items)
+                self._write_offset(ofs, new_index, sum(len(line) for line in lines[:new_index]))
@@ -0,0 +1,225 @@
+import os
+import json
+import shutil
+from .SafeOffsetFileQueue import file_lock
+
+
+class SegmentedFileQueue:
+    """
+    分段存储的多进程安全队列：固定大小的段文件 + manifest
+
+    目录结构：
+        {queue_dir}/manifest.json   段列表等元数据，只在段增删/截断时整体重写
+        {queue_dir}/state           读指针和最后一个段的长度，定长格式原地覆盖写
+        {queue_dir}/manifest.lock   所有操作共用的文件锁
+        {queue_dir}/seg_00000000.txt ...
+
+    已完全消费的段会在锁外删除（或移动到 archive_dir），截断只修改 manifest，
+    因此磁盘占用和持锁时间与历史上流过队列的任务总数无关。
+    普通的 put/get 只覆盖写 state 文件；单条操作仍比 SafeOffsetFileQueue 多读一次 manifest，
+    高频出队时建议配合 submitter 的 prefetch 参数批量认领。
+    """
+    def __init__(self, queue_dir="queue.d", segment_size=10000, archive_dir=None):
+        self.queue_dir = queue_dir
+        self.archive_dir = archive_dir
+        self.manifest_file = os.path.join(queue_dir, "manifest.json")
+        self.state_file = os.path.join(queue_dir, "state")
+        self.lock_file = os.path.join(queue_dir, "manifest.lock")
+        os.makedirs(queue_dir, exist_ok=True)
+        if archive_dir:
+            os.makedirs(archive_dir, exist_ok=True)
+        with open(self.lock_file, "a") as lf:
+            with file_lock(lf):
+                if not os.path.exists(self.manifest_file):
+                    self._save({
+                        "segment_size": segment_size,
+                        "next_id": 0,
+                        "base": 0,  # 已从 manifest 中移除的（已消费）任务数
+                        "head": {"line": 0, "byte": 0},  # 第一个段内的读指针
+                        "segments": [],
+                    })
+
+    # ---------------- manifest / 段文件 ----------------
+    def _segment_path(self, seg_id):
+        return os.path.join(self.queue_dir, f"seg_{seg_id:08d}.txt")
+
+    def _load(self):
+        """读取 manifest，并用 state 文件中更新的读指针和尾段长度覆盖（段 id 对不上的记录视为过期）"""
+        with open(self.manifest_file, "r") as f:
+            m = json.load(f)
+        try:
+            with open(self.state_file, "r") as f:
+                head_id, head_line, head_byte, tail_id, tail_count, tail_bytes = map(int, f.read().split())
+        except (OSError, ValueError):
+            return m
+        segments = m["segments"]
+        if segments and segments[0]["id"] == head_id:
+            m["head"] = {"line": head_line, "byte": head_byte}
+        if segments and segments[-1]["id"] == tail_id and not segments[-1]["sealed"]:
+            segments[-1]["count"] = tail_count
+            segments[-1]["bytes"] = tail_bytes
+        return m
+
+    def _save_state(self, m):
+        """原地覆盖写定长的 state 记录，不创建临时文件也不 rename"""
+        segments = m["segments"]
+        head_id = segments[0]["id"] if segments else -1
+        tail = segments[-1] if segments else {"id": -1, "count": 0, "bytes": 0}
+        fields = (head_id, m["head"]["line"], m["head"]["byte"], tail["id"], tail["count"], tail["bytes"])
+        data = "".join(f"{field:>20d} " for field in fields).encode()
+        fd = os.open(self.state_file, os.O_WRONLY | os.O_CREAT, 0o644)
+        try:
+            os.pwrite(fd, data, 0)
+        finally:
+            os.close(fd)
+
+    def _save(self, manifest):
+        """整体重写 manifest（段列表变化时），随后同步 state"""
+        tmp = f"{self.manifest_file}.tmp"
+        with open(tmp, "w") as f:
+            json.dump(manifest, f)
+        os.replace(tmp, self.manifest_file)
+        self._save_state(manifest)
+
+    def _reclaim(self, seg_ids):
+        """删除或归档段文件（在锁外调用）"""
+        for seg_id in seg_ids:
+            path = self._segment_path(seg_id)
+            try:
+                if self.archive_dir:
+                    shutil.move(path, os.path.join(self.archive_dir, os.path.basename(path)))
+                else:
+                    os.remove(path)
+            except FileNotFoundError:
+                pass
+
+    # ---------------- 队列接口 ----------------
+    def put(self, item):
+        """入队：追加到最后一个未满的段，必要时新建段"""
+        self.put_many([item])
+
+    def put_many(self, items):
+        """批量入队：一次加锁写入所有任务，写满的段自动切换到新段"""
+        if not items:
+            return
+        with open(self.lock_file, "a") as lf:
+            with file_lock(lf):
+                m = self._load()
+                segments = m["segments"]
+                start = 0
+                new_segment = False
+                while start < len(items):
+                    if not segments or segments[-1]["sealed"] or segments[-1]["count"] >= m["segment_size"]:
+                        segments.append({"id": m["next_id"], "count": 0, "bytes": 0, "sealed": False})
+                        m["next_id"] += 1
+                        new_segment = True
+                    seg = segments[-1]
+                    chunk = items[start:start + m["segment_size"] - seg["count"]]
+                    data = "".join(item + "\n" for item in chunk).encode()
+                    # 从 manifest 记录的位置写入，覆盖崩溃遗留的半截内容
+                    with open(self._segment_path(seg["id"]), "ab+") as sf:
+                        sf.truncate(seg["bytes"])
+                        sf.write(data)
+                    seg["count"] += len(chunk)
+                    seg["bytes"] += len(data)
+                    start += len(chunk)
+                if new_segment:
+                    self._save(m)
+                else:
+                    self._save_state(m)
+
+    def get(self):
+        """出队：读取读指针处的一条任务"""
+        items = self.get_many(1)
+        return items[0] if items else None
+
+    def get_many(self, k):
+        """批量出队：一次临界区内认领最多 k 条任务；越过已消费完的段时将其移出 manifest"""
+        consumed = []
+        items = []
+        with open(self.lock_file, "a") as lf:
+            with file_lock(lf):
+                m = self._load()
+                segments = m["segments"]
+                head = m["head"]
+                while segments and len(items) < k:
+                    seg = segments[0]
+                    if head["line"] < seg["count"]:
+                        with open(self._segment_path(seg["id"]), "rb") as sf:
+                            sf.seek(head["byte"])
+                            while head["line"] < seg["count"] and len(items) < k:
+                                line = sf.readline()
+                                head["line"] += 1
+                                head["byte"] += len(line)
+                                items.append(line.decode().strip())
+                        continue
+                    # 当前段已读完：只有确定不会再写入（已满/已封存/后面还有段）时才回收
+                    if seg["sealed"] or seg["count"] >= m["segment_size"] or len(segments) > 1:
+                        segments.pop(0)
+                        m["base"] += seg["count"]
+                        m["head"] = head = {"line": 0, "byte": 0}
+                        consumed.append(seg["id"])
+                        continue
+                    break
+                if consumed:
+                    self._save(m)
+                elif items:
+                    self._save_state(m)
+        self._reclaim(consumed)
+        return items
+
+    def qsize(self):
+        """未消费的任务数"""
+        with open(self.lock_file, "a") as lf:
+            with file_lock(lf):
+                m = self._load()
+        return sum(seg["count"] for seg in m["segments"]) - m["head"]["line"]
+
+    def empty(self):
+        """判断是否还有未处理任务"""
+        return self.qsize() <= 0
+
+    def truncate(self, num_items: int = 0):
+        """
+        截断队列，保留前 num_items 条任务（按入队总序号计），并更新读指针。
+        锁内只修改 manifest（跨越截断点的段被封存），被截断的段文件在锁外删除或归档。
+        """
+        with open(self.lock_file, "a") as lf:
+            with file_lock(lf):
+                m = self._load()
+                start = m["base"]
+                kept = []
+                for seg in m["segments"]:
+                    if start >= num_items:
+                        break
+                    if start + seg["count"] > num_items:
+                        seg["count"] = num_items - start
+                        seg["sealed"] = True
+                    kept.append(seg)
+                    start += seg["count"]
+                if not kept:
+                    # 保留的任务都已被消费
+                    m["base"] = num_items
+                    m["head"] = {"line": 0, "byte": 0}
+                elif m["head"]["line"] > kept[0]["count"]:
+                    m["head"]["line"] = kept[0]["count"]
+                dropped = [seg["id"] for seg in m["segments"][len(kept):]]
+                m["segments"] = kept
+                self._save(m)
+        self._reclaim(dropped)
+
+    def compact(self):
+        """回收所有不在 manifest 中的段文件（崩溃遗留）"""
+        with open(self.lock_file, "a") as lf:
+            with file_lock(lf):
+                m = self._load()
+        live = {seg["id"] for seg in m["segments"]}
+        stale = []
+        for name in os.listdir(self.queue_dir):
+            if name.startswith("seg_") and name.endswith(".txt"):
+                seg_id = int(name[4:-4])
+                # 只回收读取 manifest 时已分配过的 id，避免误删并发新建的段
+                if seg_id < m["next_id"] and seg_id not in live:
+                    stale.append(seg_id)
+        self._reclaim(stale)
+        return len(stale)
@@ -1,62 +1,96 @@
 import os
+import re
+import math
+import time
+import shlex
 import subprocess
 from .JobSubmitter import CudaJobSubmitter, ConcurrentJobSubmitter
+from .SafeOffsetFileQueue import SafeOffsetFileQueue
 class SlurmJobSubmitter:
     '''
     only support for slurm
-    only a gpu per job
+    每个 slurm 任务（worker）占用一个节点，在节点内运行 CudaJobSubmitter / ConcurrentJobSubmitter；
+    多个 worker（job array）共享同一个 {file_prefix}_queue.txt，通过文件锁安全地分取任务
     '''
-    def __init__(self,file_prefix='',ntasks=70, ncpus=70, require_gpu=True, mem=475, partition='gpujl'):
+    def __init__(self,file_prefix='',ntasks=70, ncpus=70, require_gpu=True, mem=475, partition='gpujl',
+                 gpu_cnt=4, gpu_ids=None, sbatch='sbatch', squeue='squeue', scancel='scancel'):
         '''
         for gpu job, only one gpu per job, and execute commands sequentially
         for cpu job, zero gpu per job, execute commands in parallel, and each job use 10 cpus
+        gpu_cnt: 每个 worker 申请的 GPU 数
+        gpu_ids: worker 使用的 GPU ID；None 表示在节点上通过 CUDA_VISIBLE_DEVICES / nvidia-smi 自动发现
+        sbatch/squeue/scancel: 对应命令（字符串或列表），测试时可以替换为本地脚本
         '''
         self.ntasks = ntasks # number of concurrent tasks for cpu job, not slurm ntasks
         self.require_gpu = require_gpu
         self.file_prefix = file_prefix
 
         self.cpus_per_task = ncpus
-        self.mem = mem 
+        self.mem = mem
         self.partition = partition
-        self.gpu_cnt = 4 if require_gpu else 0
+        self.gpu_cnt = gpu_cnt if require_gpu else 0
+        self.gpu_ids = gpu_ids
+        self.sbatch = sbatch
+        self.squeue = squeue
+        self.scancel = scancel
         self.outdir = 'Submiter/slurm_logs'
         if not os.path.exists(self.outdir):
             os.makedirs(self.outdir)
 
-    def addJobs(self, commands):
+    def _local_submitter(self):
+        # 只用于操作队列，不探测 GPU
         if self.require_gpu:
-            submitter = CudaJobSubmitter(file_prefix=self.file_prefix, gpu_ids=[0,1,2,3])
-        else:
-            submitter = ConcurrentJobSubmitter(file_prefix=self.file_prefix, max_jobs=self.ntasks)
-        submitter.addJobs(commands)
-    
+            return CudaJobSubmitter(file_prefix=self.file_prefix, gpu_ids=self.gpu_ids if self.gpu_ids is not None else [])
+        return ConcurrentJobSubmitter(file_prefix=self.file_prefix, max_jobs=self.ntasks)
+
+    def addJobs(self, commands):
+        self._local_submitter().addJobs(commands)
+
     def truncate(self, num_items):
-        if self.require_gpu:
-            submitter = CudaJobSubmitter(file_prefix=self.file_prefix, gpu_ids=[0,1,2,3])
-        else:
-            submitter = ConcurrentJobSubmitter(file_prefix=self.file_prefix, max_jobs=self.ntasks)
-        submitter.truncate(num_items)
+        self._local_submitter().truncate(num_items)
+
+    def backlog(self):
+        '''队列中尚未被任何 worker 认领的任务数'''
+        return SafeOffsetFileQueue(queue_file=f"{self.file_prefix}_queue.txt",
+                                   offset_file=f"{self.file_prefix}_offset.txt").qsize()
+
+    def _run(self, command, *args):
+        command = shlex.split(command) if isinstance(command, str) else list(command)
+        return subprocess.run(command + list(args), capture_output=True, text=True)
 
-    def submit(self,job_name, repeat_last=False):
+    def submit(self,job_name, repeat_last=False, workers=1):
+        '''
+        提交 worker；workers > 1 时以 job array 提交，每个 array 任务是一个独立节点上的 worker
+        :return: sbatch 返回的 job id
+        '''
         # generate python script
         python_script = f'''import time
 import subprocess
 import os
 from Submitter import CudaJobSubmitter, ConcurrentJobSubmitter
+worker_id = os.environ.get('SLURM_JOB_ID', str(os.getpid()))
 '''
         if self.require_gpu:
-            python_script += f'''submitter = CudaJobSubmitter(file_prefix='{self.file_prefix}', gpu_ids=[0,1,2,3])
+            python_script += f'''submitter = CudaJobSubmitter(file_prefix='{self.file_prefix}', gpu_ids={self.gpu_ids!r}, worker_id=worker_id)
 submitter.submit(repeat_last={str(repeat_last)})'''
         else:
-            python_script += f'''submitter = ConcurrentJobSubmitter(file_prefix='{self.file_prefix}', max_jobs={self.ntasks})
+            python_script += f'''submitter = ConcurrentJobSubmitter(file_prefix='{self.file_prefix}', max_jobs={self.ntasks}, worker_id=worker_id)
 submitter.submit(repeat_last={str(repeat_last)})'''
         with open(f'{self.outdir}/python_script_{job_name}.py','w') as f:
             f.write(python_script)
         job_command = f'python {self.outdir}/python_script_{job_name}.py'
 
+        if workers > 1:
+            array = f'#SBATCH --array=0-{workers - 1}\n'
+            output = f'{self.outdir}/{job_name}_%A_%a.out'
+        else:
+            array = ''
+            # 带上 job id：scale() 多次补交单个 worker 时不会互相覆盖输出
+            output = f'{self.outdir}/{job_name}_%j.out'
+
         script = f'''#!/bin/bash
 #SBATCH --job-name={job_name}
-#SBATCH --output={self.outdir}/{job_name}.out
+#SBATCH --output={output}
 #SBATCH --time=5-15:00:00
 #SBATCH --nodes=1
 #SBATCH --ntasks=1
@@ -64,12 +98,60 @@ submitter.submit(repeat_last={str(repeat_last)})'''
 #SBATCH --mem={self.mem}G
 #SBATCH --partition={self.partition}
 #SBATCH --gres=gpu:{self.gpu_cnt}
-{job_command}'''
-        
+{array}{job_command}'''
+
         with open(f'{self.outdir}/script_{job_name}.sh','w') as f:
             f.write(script)
-        result = subprocess.run(['sbatch', f'{self.outdir}/script_{job_name}.sh'], capture_output=True, text=True)
-    
+        result = self._run(self.sbatch, f'{self.outdir}/script_{job_name}.sh')
+        if result.returncode != 0:
+            raise RuntimeError(f"sbatch 提交失败: {result.stderr.strip()}")
+        job_ids = re.findall(r'\d+', result.stdout)
+        return job_ids[-1] if job_ids else None
+
+    def workers(self, job_name):
+        '''
+        通过 squeue 查询名为 job_name 的 worker，返回 [(job_id, state)]，state 如 PD / R
+        使用 -r 让 job array 的每个元素单独成行（如 1234_5），否则排队中的整个 array 会合并成一行
+        '''
+        result = self._run(self.squeue, '-h', '-r', '-n', job_name, '-o', '%i %t')
+        if result.returncode != 0:
+            raise RuntimeError(f"squeue 查询失败: {result.stderr.strip()}")
+        jobs = []
+        for line in result.stdout.splitlines():
+            fields = line.split()
+            if len(fields) >= 2:
+                jobs.append((fields[0], fields[1]))
+        return jobs
+
+    def scale(self, job_name, max_workers, jobs_per_worker=None, repeat_last=False):
+        '''
+        根据队列积压调整 worker 数：每 jobs_per_worker 条积压任务对应一个 worker，最多 max_workers 个。
+        不足时以 job array 补交；过多时取消尚在排队（PD）的 worker，运行中的 worker 在队列取空后自行退出。
+        '''
+        if jobs_per_worker is None:
+            jobs_per_worker = self.gpu_cnt if self.require_gpu else self.ntasks
+        backlog = self.backlog()
+        jobs = self.workers(job_name)
+        desired = min(max_workers, math.ceil(backlog / max(jobs_per_worker, 1)))
+        submitted, cancelled = 0, []
+        if desired > len(jobs):
+            submitted = desired - len(jobs)
+            self.submit(job_name, repeat_last=repeat_last, workers=submitted)
+        elif desired < len(jobs):
+            pending = [job_id for job_id, state in jobs if state == 'PD']
+            cancelled = pending[:len(jobs) - desired]
+            if cancelled:
+                self._run(self.scancel, *cancelled)
+        return {"backlog": backlog, "workers": len(jobs), "submitted": submitted, "cancelled": len(cancelled)}
+
+    def autoscale(self, job_name, max_workers, jobs_per_worker=None, interval=60, repeat_last=False):
+        '''每 interval 秒调用一次 scale()，直到队列为空且没有 worker'''
+        while True:
+            status = self.scale(job_name, max_workers, jobs_per_worker, repeat_last)
+            if status["backlog"] == 0 and status["workers"] == 0:
+                return
+            time.sleep(interval)
+
 
 if __name__ == '__main__':
     commands = [f'python smote.py --seed {i} --dataset \'credit-g\' --sampler TreeSMOTE2 --model DecisionTree' for i in range(20)]
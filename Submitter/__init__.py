@@ -2,3 +2,6 @@ from .JobSubmitter import ConcurrentJobSubmitter
 from .JobSubmitter import CudaJobSubmitter
 from .SlurmJobSubmitter import SlurmJobSubmitter
 from .SafeOffsetFileQueue import SafeOffsetFileQueue
+from .SegmentedFileQueue import SegmentedFileQueue
+from .AdmissionController import AdmissionController
+from .FunctionJobSubmitter import FunctionJobSubmitter
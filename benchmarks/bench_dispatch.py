@@ -0,0 +1,98 @@
+"""
+调度器端到端基准：ConcurrentJobSubmitter / CudaJobSubmitter 执行 `true`、`sleep 0.1` 等命令时的
+吞吐量、派发延迟（槽位空出到下一个任务启动）、槽位利用率和空闲间隙。GPU ID 为假值，任务不会真正使用 GPU。
+结果以 JSON 输出。
+
+用法: python benchmarks/bench_dispatch.py --jobs 200 --slots 4 --commands "true,sleep 0.1" --output bench_dispatch.json
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from Submitter import ConcurrentJobSubmitter, CudaJobSubmitter
+from Submitter.JobMetrics import load_records
+
+
+def dispatch_latencies(records, slots):
+    """
+    槽位空出到下一个任务启动的延迟
+
+    队列不空时调度器总是在某个槽位空出后才启动新任务，因此把前 slots 个之后的第 k 个启动
+    与第 k 个结束配对（均按时间排序），启动时间 - 结束时间 即该槽位的空闲时长。
+    """
+    starts = sorted(r["start"] for r in records)[slots:]
+    ends = sorted(r["end"] for r in records)
+    return [start - end for start, end in zip(starts, ends)]
+
+
+def bench(kind, command, jobs, slots, event_driven):
+    """在临时目录中运行一次完整的 addJobs + submit，返回 summary() 中的关键指标"""
+    root = tempfile.mkdtemp(prefix="bench_dispatch_")
+    cwd = os.getcwd()
+    os.chdir(root)
+    try:
+        prefix = "bench"
+        if kind == "cuda":
+            submitter = CudaJobSubmitter(file_prefix=prefix, gpu_ids=list(range(slots)), event_driven=event_driven)
+        else:
+            submitter = ConcurrentJobSubmitter(file_prefix=prefix, max_jobs=slots, event_driven=event_driven)
+        submitter.addJobs([command] * jobs)
+        start = time.perf_counter()
+        submitter.submit()
+        seconds = time.perf_counter() - start
+        summary = submitter.summary()
+        latencies = dispatch_latencies(load_records(submitter.metrics_file), slots)
+        return {
+            "submitter": kind,
+            "command": command,
+            "jobs": jobs,
+            "slots": slots,
+            "event_driven": event_driven,
+            "seconds": seconds,
+            "jobs_per_sec": jobs / seconds,
+            "dispatch_latency_mean": sum(latencies) / len(latencies) if latencies else None,
+            "dispatch_latency_max": max(latencies, default=None),
+            "utilization": summary["utilization"],
+            "idle_total": summary["idle_total"],
+            "idle_max": summary["idle_max"],
+            "failed": summary["failed"],
+        }
+    finally:
+        os.chdir(cwd)
+        shutil.rmtree(root, ignore_errors=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--jobs", type=int, default=200)
+    parser.add_argument("--slots", type=int, default=4)
+    parser.add_argument("--commands", default="true,sleep 0.1")
+    parser.add_argument("--submitters", default="concurrent,cuda")
+    parser.add_argument("--polling", action="store_true", help="同时测试 event_driven=False 的轮询模式（很慢）")
+    parser.add_argument("--output", default=None, help="JSON 输出文件，默认打印到 stdout")
+    args = parser.parse_args()
+
+    modes = [True, False] if args.polling else [True]
+    results = {
+        "benchmark": "dispatch",
+        "time": time.time(),
+        "runs": [bench(kind, command, args.jobs, args.slots, event_driven)
+                 for kind in args.submitters.split(",")
+                 for command in args.commands.split(",")
+                 for event_driven in modes],
+    }
+    text = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text)
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+"""
+队列吞吐量基准：SafeOffsetFileQueue / SegmentedFileQueue 的 put/get/empty/truncate，
+以及 K 个生产者/消费者进程并发时的锁竞争。结果以 JSON 输出。
+
+用法: python benchmarks/bench_queue.py --sizes 1000,10000,100000,1000000 --procs 1,4,8 --output bench_queue.json
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import tempfile
+import multiprocessing
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from Submitter import SafeOffsetFileQueue, SegmentedFileQueue
+
+
+def make_queue(backend, root):
+    if backend == "file":
+        return SafeOffsetFileQueue(queue_file=os.path.join(root, "queue.txt"),
+                                   offset_file=os.path.join(root, "offset.txt"))
+    return SegmentedFileQueue(queue_dir=os.path.join(root, "queue.d"))
+
+
+def rate(count, seconds):
+    return {"ops": count, "seconds": seconds, "ops_per_sec": count / seconds if seconds > 0 else None}
+
+
+def timed(fn):
+    start = time.perf_counter()
+    fn()
+    return time.perf_counter() - start
+
+
+def bench_single(backend, size, op_limit):
+    """单进程：put_many 填充 size 条，再测 put/get/get_many/empty/truncate"""
+    root = tempfile.mkdtemp(prefix="bench_queue_")
+    try:
+        q = make_queue(backend, root)
+        items = [f"python smote.py --seed {i} --dataset credit-g" for i in range(size)]
+        result = {"backend": backend, "size": size}
+        result["put_many"] = rate(size, timed(lambda: q.put_many(items)))
+
+        n = min(size, op_limit)
+        result["put"] = rate(n, timed(lambda: [q.put(item) for item in items[:n]]))
+        result["get"] = rate(n, timed(lambda: [q.get() for _ in range(n)]))
+        result["get_many_64"] = rate(n, timed(lambda: [q.get_many(64) for _ in range(n // 64 or 1)]))
+        result["empty"] = rate(n, timed(lambda: [q.empty() for _ in range(n)]))
+        result["truncate"] = rate(1, timed(lambda: q.truncate(size // 2)))
+        return result
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+
+
+def _producer(backend, root, count):
+    q = make_queue(backend, root)
+    for i in range(count):
+        q.put(f"job {os.getpid()} {i}")
+
+
+def _consumer(backend, root, stop_at, counter):
+    q = make_queue(backend, root)
+    while True:
+        if q.get() is None:
+            with counter.get_lock():
+                if counter.value >= stop_at:
+                    return
+            continue
+        with counter.get_lock():
+            counter.value += 1
+
+
+def bench_contention(backend, procs, per_producer):
+    """procs 个生产者和 procs 个消费者同时操作一个队列"""
+    root = tempfile.mkdtemp(prefix="bench_queue_")
+    try:
+        make_queue(backend, root)
+        ctx = multiprocessing.get_context("fork")
+        total = procs * per_producer
+        counter = ctx.Value("l", 0)
+        workers = [ctx.Process(target=_producer, args=(backend, root, per_producer)) for _ in range(procs)]
+        workers += [ctx.Process(target=_consumer, args=(backend, root, total, counter)) for _ in range(procs)]
+        start = time.perf_counter()
+        for w in workers:
+            w.start()
+        for w in workers:
+            w.join()
+        seconds = time.perf_counter() - start
+        return {"backend": backend, "procs": procs, "items": total, "consumed": counter.value,
+                **rate(total, seconds)}
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes", default="1000,10000,100000")
+    parser.add_argument("--procs", default="1,4")
+    parser.add_argument("--backends", default="file,segmented")
+    parser.add_argument("--op-limit", type=int, default=10000, help="单条 put/get/empty 测试的最大次数")
+    parser.add_argument("--per-producer", type=int, default=2000)
+    parser.add_argument("--output", default=None, help="JSON 输出文件，默认打印到 stdout")
+    args = parser.parse_args()
+
+    backends = args.backends.split(",")
+    results = {
+        "benchmark": "queue",
+        "time": time.time(),
+        "single": [bench_single(b, int(size), args.op_limit)
+                   for b in backends for size in args.sizes.split(",")],
+        "contention": [bench_contention(b, int(procs), args.per_producer)
+                       for b in backends for procs in args.procs.split(",")],
+    }
+    text = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text)
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
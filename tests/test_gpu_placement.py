@@ -0,0 +1,76 @@
+import os
+import shutil
+import tempfile
+import subprocess
+import unittest
+
+from Submitter import CudaJobSubmitter
+
+
+class _StubProbe:
+    """替代 nvidia-smi 的显存探测：返回固定的 {gpu_index: {"total", "free"}}"""
+    def __init__(self, memory):
+        self.memory = memory
+
+    def __call__(self):
+        return self.memory
+
+
+class GpuPlacementTest(unittest.TestCase):
+    def setUp(self):
+        self.cwd = os.getcwd()
+        self.tmp = tempfile.mkdtemp()
+        os.chdir(self.tmp)
+        self.procs = []
+
+    def tearDown(self):
+        for proc in self.procs:
+            proc.kill()
+            proc.wait()
+        os.chdir(self.cwd)
+        shutil.rmtree(self.tmp, ignore_errors=True)
+
+    def _submitter(self, memory, gpu_ids, slots_per_gpu=2, placement="pack"):
+        return CudaJobSubmitter(file_prefix="t", gpu_ids=gpu_ids, slots_per_gpu=slots_per_gpu,
+                                memory_probe=_StubProbe(memory), placement=placement, event_driven=False)
+
+    def _occupy(self, submitter, gpu_id, gpu_mem):
+        # 模拟刚启动、尚未申请显存的任务：探测到的空闲显存不变
+        proc = subprocess.Popen(["sleep", "60"])
+        self.procs.append(proc)
+        submitter._jobs[proc] = {"spec": {"gpu_mem": gpu_mem}}
+        submitter.cuda_processes[gpu_id].append(proc)
+
+    def test_reserved_memory_is_subtracted_from_probed_free(self):
+        submitter = self._submitter({0: {"total": 100, "free": 50}}, gpu_ids=[0])
+        spec = {"gpu_mem": 40}
+        self.assertEqual(submitter._get_available_resource(spec), 0)
+        self._occupy(submitter, 0, 40)
+        self.assertIsNone(submitter._get_available_resource(spec))
+
+    def test_pack_moves_to_next_gpu_when_memory_is_short(self):
+        memory = {0: {"total": 100, "free": 50}, 1: {"total": 100, "free": 100}}
+        submitter = self._submitter(memory, gpu_ids=[0, 1])
+        self._occupy(submitter, 1, 40)
+        # 打包：优先放到已有任务的 GPU 1（剩余 60）
+        self.assertEqual(submitter._get_available_resource({"gpu_mem": 40}), 1)
+        self._occupy(submitter, 1, 40)
+        # GPU 1 槽位已满，GPU 0 剩余 50
+        self.assertEqual(submitter._get_available_resource({"gpu_mem": 40}), 0)
+        self.assertIsNone(submitter._get_available_resource({"gpu_mem": 60}))
+
+    def test_spread_prefers_least_loaded_gpu(self):
+        memory = {0: {"total": 100, "free": 100}, 1: {"total": 100, "free": 100}}
+        submitter = self._submitter(memory, gpu_ids=[0, 1], placement="spread")
+        self._occupy(submitter, 0, 10)
+        self.assertEqual(submitter._get_available_resource({"gpu_mem": 10}), 1)
+
+    def test_jobs_without_gpu_mem_only_use_slots(self):
+        submitter = self._submitter({}, gpu_ids=[0], slots_per_gpu=1)
+        self.assertEqual(submitter._get_available_resource(), 0)
+        self._occupy(submitter, 0, 0)
+        self.assertIsNone(submitter._get_available_resource())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,80 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from Submitter import SlurmJobSubmitter
+
+
+def _write_script(path, body):
+    with open(path, "w") as f:
+        f.write("#!/bin/sh\n" + body)
+    os.chmod(path, 0o755)
+
+
+class SlurmScaleTest(unittest.TestCase):
+    """用本地脚本替代 sbatch/squeue/scancel：记录收到的参数，squeue 输出 squeue.txt 的内容"""
+    def setUp(self):
+        self.cwd = os.getcwd()
+        self.tmp = tempfile.mkdtemp()
+        os.chdir(self.tmp)
+        _write_script("sbatch", 'echo "$@" >> sbatch.args\necho "Submitted batch job 42"\n')
+        _write_script("squeue", 'echo "$@" > squeue.args\ncat squeue.txt 2>/dev/null\nexit 0\n')
+        _write_script("scancel", 'echo "$@" >> scancel.args\n')
+        self.set_workers([])
+        self.submitter = SlurmJobSubmitter(file_prefix="t", ntasks=4, require_gpu=False,
+                                           sbatch=os.path.abspath("sbatch"), squeue=os.path.abspath("squeue"),
+                                           scancel=os.path.abspath("scancel"))
+
+    def tearDown(self):
+        os.chdir(self.cwd)
+        shutil.rmtree(self.tmp, ignore_errors=True)
+
+    def set_workers(self, jobs):
+        with open("squeue.txt", "w") as f:
+            f.writelines(f"{job_id} {state}\n" for job_id, state in jobs)
+
+    def read(self, path):
+        if not os.path.exists(path):
+            return ""
+        with open(path, "r") as f:
+            return f.read()
+
+    def test_submits_job_array_for_backlog(self):
+        self.submitter.addJobs([f"echo {i}" for i in range(10)])
+        status = self.submitter.scale("w", max_workers=5, jobs_per_worker=4)
+        self.assertEqual(status, {"backlog": 10, "workers": 0, "submitted": 3, "cancelled": 0})
+        script = self.read(self.submitter.outdir + "/script_w.sh")
+        self.assertIn("#SBATCH --array=0-2", script)
+        self.assertIn("w_%A_%a.out", script)
+        self.assertEqual(self.read("squeue.args").split(), ["-h", "-r", "-n", "w", "-o", "%i", "%t"])
+
+    def test_respects_max_workers(self):
+        self.submitter.addJobs([f"echo {i}" for i in range(100)])
+        status = self.submitter.scale("w", max_workers=2, jobs_per_worker=4)
+        self.assertEqual(status["submitted"], 2)
+
+    def test_single_worker_output_is_unique_per_job(self):
+        self.submitter.addJobs(["echo 0"])
+        self.submitter.scale("w", max_workers=5, jobs_per_worker=4)
+        script = self.read(self.submitter.outdir + "/script_w.sh")
+        self.assertNotIn("--array", script)
+        self.assertIn("w_%j.out", script)
+
+    def test_cancels_only_pending_workers(self):
+        self.submitter.addJobs(["echo 0", "echo 1"])
+        self.set_workers([("9_0", "R"), ("9_1", "PD"), ("9_2", "PD")])
+        status = self.submitter.scale("w", max_workers=5, jobs_per_worker=4)
+        self.assertEqual(status, {"backlog": 2, "workers": 3, "submitted": 0, "cancelled": 2})
+        self.assertEqual(self.read("scancel.args").split(), ["9_1", "9_2"])
+        self.assertEqual(self.read("sbatch.args"), "")
+
+    def test_no_change_when_worker_count_matches(self):
+        self.submitter.addJobs([f"echo {i}" for i in range(8)])
+        self.set_workers([("7_0", "R"), ("7_1", "R")])
+        status = self.submitter.scale("w", max_workers=5, jobs_per_worker=4)
+        self.assertEqual((status["submitted"], status["cancelled"]), (0, 0))
+
+
+if __name__ == "__main__":
+    unittest.main()